@@ -0,0 +1,273 @@
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+import argparse
+import importlib
+import io
+import math
+import os
+import random
+import re
+import time
+import xml.etree.ElementTree as ET
+from typing import Callable, List, Tuple
+
+import draw_protocol
+import draw_protocol_reference
+
+# Renders the examples and randomly generated protocols with the frozen
+# reference implementation, with draw_protocol and with further optimised
+# render paths, the outputs are compared structurally. The examples are
+# additionally compared to the SVGs in rendered/.
+#
+# eg.: python3 check_rendering.py --candidate my_module:convert_to_svg
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES_DIR = os.path.join(BASE_DIR, "examples")
+RENDERED_DIR = os.path.join(BASE_DIR, "rendered")
+
+RenderPath = Callable[[str, str], str]
+
+
+@dataclass
+class Case:
+    name: str
+    description: str
+    filename: str
+    golden: "str | None" = None
+
+
+def load_render_path(spec: str) -> RenderPath:
+    module_name, _, function_name = spec.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, function_name or "convert_to_svg")
+
+
+##### structural comparison #####
+
+NUMBER = re.compile(r"(-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+
+# returns None if equal, a description of the first difference otherwise
+def compare_values(a: str, b: str, tolerance: float):
+    tokens_a = NUMBER.split(a)
+    tokens_b = NUMBER.split(b)
+    if len(tokens_a) != len(tokens_b):
+        return f"{a!r} != {b!r}"
+
+    # numbers are at odd indices
+    for i, (ta, tb) in enumerate(zip(tokens_a, tokens_b)):
+        if i % 2 == 0:
+            if ta != tb: return f"{a!r} != {b!r}"
+        elif not math.isclose(float(ta), float(tb), rel_tol=0, abs_tol=tolerance):
+            return f"{a!r} != {b!r}"
+    return None
+
+def compare_elements(a: ET.Element, b: ET.Element, tolerance: float, path: str="svg"):
+    if a.tag != b.tag:
+        return f"{path}: tag {a.tag!r} != {b.tag!r}"
+
+    if a.attrib.keys() != b.attrib.keys():
+        return f"{path}: attributes {sorted(a.attrib)} != {sorted(b.attrib)}"
+
+    for k in a.attrib:
+        if (diff := compare_values(a.attrib[k], b.attrib[k], tolerance)):
+            return f"{path}@{k}: {diff}"
+
+    # text content is compared exactly
+    if (a.text or "") != (b.text or ""):
+        return f"{path}: text {a.text!r} != {b.text!r}"
+
+    if len(a) != len(b):
+        return f"{path}: {len(a)} children != {len(b)} children"
+
+    for i, (ca, cb) in enumerate(zip(a, b)):
+        tag = ca.tag.rsplit("}", 1)[-1]
+        if (diff := compare_elements(ca, cb, tolerance, f"{path}/{tag}[{i}]")):
+            return diff
+    return None
+
+def compare_svg(a: str, b: str, tolerance: float):
+    try:
+        ea, eb = ET.fromstring(a), ET.fromstring(b)
+    except ET.ParseError as e:
+        return f"invalid svg: {e}"
+    return compare_elements(ea, eb, tolerance)
+
+
+##### random protocols #####
+
+WORDS = ["key", "nonce", "hash", "ack", "x", "$g^a$", "$H(m)$", "a<b", "R&D",
+         "\\text{id}", "$\\begin{pmatrix}1&0\\end{pmatrix}$", "°", "*", "_", "",
+         # escaped and unescaped `&` for fix_amp
+         "\\&", "a\\\\&b", "\\\\\\&", "&&",
+         # nested math mode and text for make_bold
+         "\\text{a&b}", "$\\text{x&y}$", "**$a&b$**", "**\\text{a\\&b}**",
+         "\\textbf{x}", "$\\boldsymbol{y}$"]
+
+def random_text(rng: random.Random):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 4)))
+
+def random_action(rng: random.Random):
+    kind = rng.randrange(6)
+    if kind == 0: return "-"*rng.randint(3, 6)
+    text = random_text(rng)
+    if kind == 1: return f"°{text}°"
+    if kind == 2: return f"**{text}**"
+    if kind == 3: return f"_{text}_"
+    if kind == 4: return f"**_{text}_**"
+    return text
+
+def random_protocol(rng: random.Random):
+    names = [f"A{i}" for i in range(rng.randint(2, 5))]
+    lines = []
+
+    if rng.random() < 0.3:
+        lines.append(f"!INCLUDE themes/{rng.choice(['auto', 'dark'])}.txt")
+
+    for name in names:
+        if rng.random() < 0.2:
+            lines.append(f"!ACTOR {name}[#000000,#eeeeee] {random_text(rng)}")
+        else:
+            lines.append(f"!ACTOR {name} {random_text(rng)}")
+
+    PROPERTIES = [
+        ("width", lambda: str(rng.choice([0, 60, 100.5, 140]))),
+        ("space", lambda: str(rng.choice([20, 50, 100]))),
+        ("fg-color", lambda: rng.choice(["black", "#112233", "1", "#000000:#ffffff"])),
+        ("bg-color", lambda: rng.choice(["white", "2", "#ddeeff:#223366"])),
+        ("hl-color", lambda: rng.choice(["red", "h3"])),
+        ("title-line", lambda: rng.choice(["0", "1", "true"])),
+        ("box", lambda: rng.choice(["0", "1", "false"])),
+    ]
+    for _ in range(rng.randint(0, 4)):
+        field, value = rng.choice(PROPERTIES)
+        target = rng.choice(["*", rng.choice(names), f"[{','.join(rng.sample(names, 2))}]"])
+        lines.append(f"{rng.choice(['!SET ', '!!'])}{target}.{field} {value()}")
+
+    for _ in range(rng.randint(1, 60)):
+        if rng.random() < 0.5:
+            chain = rng.sample(names, rng.randint(2, min(3, len(names))))
+            lines.append(f"{rng.choice(['>>', '<<']).join(chain)}: {random_text(rng)}")
+        else:
+            height = rng.choice(["", "", "", "[0]", "[-1]", "[2]", "[0.5]"])
+            lines.append(f"{rng.choice(names)}{height}: {random_action(rng)}")
+
+    return "\n".join(lines) + "\n"
+
+
+##### cases #####
+
+def example_cases() -> List[Case]:
+    cases = []
+    for fn in sorted(os.listdir(EXAMPLES_DIR)):
+        if not fn.endswith(".txt"): continue
+        fn_in = os.path.join(EXAMPLES_DIR, fn)
+        with open(fn_in, "rt") as f: description = f.read()
+
+        golden = None
+        fn_golden = os.path.join(RENDERED_DIR, fn[:-4] + ".svg")
+        if os.path.exists(fn_golden):
+            with open(fn_golden, "rt") as f: golden = f.read()
+
+        cases.append(Case(f"examples/{fn}", description, fn_in, golden))
+    return cases
+
+def random_cases(count: int, seed: int) -> List[Case]:
+    rng = random.Random(seed)
+    return [Case(f"random/{seed}-{i}", random_protocol(rng), f"random-{i}.txt") for i in range(count)]
+
+
+##### running #####
+
+# best of `repeat` runs, in seconds, warnings of the renderer are discarded
+def timed(render: RenderPath, case: Case, repeat: int) -> Tuple[str, float]:
+    best = math.inf
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            out = render(case.description, case.filename)
+            best = min(best, time.perf_counter() - t0)
+    return out, best
+
+def check_case(case: Case, reference: RenderPath, candidates: "list[tuple[str, RenderPath]]",
+               tolerance: float, repeat: int) -> "list[str]":
+    failures = []
+    expected, t_ref = timed(reference, case, repeat)
+
+    if case.golden is not None:
+        if (diff := compare_svg(case.golden, expected, tolerance)):
+            failures.append(f"{case.name}: reference differs from golden: {diff}")
+
+    report = f"{case.name:<24} reference {t_ref*1000:8.2f}ms"
+    for name, render in candidates:
+        try:
+            actual, t = timed(render, case, repeat)
+        except Exception as e:
+            failures.append(f"{case.name}: {name} raised {e!r}")
+            continue
+
+        if (diff := compare_svg(expected, actual, tolerance)):
+            failures.append(f"{case.name}: {name} differs from reference: {diff}")
+        report += f"  {name} {t*1000:8.2f}ms ({t/t_ref if t_ref else math.inf:.2f}x)"
+
+    print(report)
+    return failures
+
+# every row has to be drawn in all chunks it is visible in,
+# the chunks have to cover the whole protocol without gaps
+def check_chunks(case: Case, chunk_height: float) -> "list[str]":
+    with redirect_stdout(io.StringIO()):
+        layout = draw_protocol.layout_protocol(case.description, case.filename)
+    chunks = draw_protocol.layout_chunks(layout, chunk_height)
+
+    failures = []
+    if chunks[0].top > 0:
+        failures.append(f"{case.name}: first chunk starts at {chunks[0].top}")
+    for c, c_next in zip(chunks, chunks[1:]):
+        if not c.top < c_next.top or c.top + c.height != c_next.top:
+            failures.append(f"{case.name}: chunk at {c.top} with height {c.height} is followed by a chunk at {c_next.top}")
+    if chunks[-1].top + chunks[-1].height < layout.height:
+        failures.append(f"{case.name}: chunks end at {chunks[-1].top + chunks[-1].height}, above {layout.height}")
+
+    for rows, chunk_rows in ((layout.draw_elements, lambda c: c.draw_elements),
+                             (layout.text_elements, lambda c: c.text_elements)):
+        chunk_row_ids = [{id(row) for row in chunk_rows(c)} for c in chunks]
+        for row in rows:
+            y0, y1, _ = row
+            for c, row_ids in zip(chunks, chunk_row_ids):
+                if y0 <= c.top + c.height and c.top <= y1 and id(row) not in row_ids:
+                    failures.append(f"{case.name}: row [{y0}, {y1}] missing in chunk at {c.top}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare render paths against the reference implementation")
+    parser.add_argument("--candidate", action="append", default=[], metavar="MODULE:FUNCTION",
+                        help="optimised render path, same signature as convert_to_svg")
+    parser.add_argument("--count", type=int, default=100, help="number of random protocols")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="absolute tolerance for numbers")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is reported")
+    parser.add_argument("--chunk-height", type=float, default=100, help="chunk height for checking the html output")
+    args = parser.parse_args(argv)
+
+    candidates = [("draw_protocol", draw_protocol.convert_to_svg)]
+    candidates += [(spec, load_render_path(spec)) for spec in args.candidate]
+
+    cases = example_cases() + random_cases(args.count, args.seed)
+
+    failures = []
+    for case in cases:
+        try:
+            failures += check_case(case, draw_protocol_reference.convert_to_svg, candidates, args.tolerance, args.repeat)
+            failures += check_chunks(case, args.chunk_height)
+        except Exception as e:
+            failures.append(f"{case.name}: reference raised {e!r}")
+
+    for failure in failures:
+        print(failure)
+    print(f"{len(cases)} cases, {len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__=="__main__":
+    exit(main())
@@ -1,4 +1,6 @@
+from bisect import bisect_right
 from dataclasses import dataclass
+import json
 import os
 from typing import Tuple
 
@@ -27,6 +29,20 @@ class Actor:
     title_line: bool = True
     message_space_right: "float | None" = None
 
+# y-range of a row in the diagram and the svg code drawn within it
+RowElement = Tuple[float, float, str]
+
+@dataclass
+class ProtocolLayout:
+    width: float
+    height: float
+    header_height: float
+    style: str
+    rect_elements: str
+    title_elements: str
+    draw_elements: "list[RowElement]"
+    text_elements: "list[RowElement]"
+
 
 def or_default(value, default):
     return value if value is not None else default
@@ -109,7 +125,7 @@ def find_include_file(filename):
 LineLocation = Tuple[str, int]
 
 
-def convert_to_svg(game_description : str, filename : str, line_offset : int=1) -> str:
+def layout_protocol(game_description : str, filename : str, line_offset : int=1) -> ProtocolLayout:
     def parsingerror(description, location : LineLocation, line : str):
         filename, lineno = location
         raise Exception(f"Parsing Error: {filename}:{lineno}: {description}\n\t{line}")
@@ -364,8 +380,9 @@ def convert_to_svg(game_description : str, filename : str, line_offset : int=1)
     actor_prev_was_msg = [True]*len(actors)
     message_cursors = [action_offset/2*line_height]*(len(actors)-1)
 
-    draw_elements = ""
-    text_elements = ""
+    title_elements = ""
+    draw_elements = [] # RowElement
+    text_elements = [] # RowElement
 
     stroke_width = 1 #0.75
 
@@ -512,7 +529,7 @@ def convert_to_svg(game_description : str, filename : str, line_offset : int=1)
 
     for i, actor in enumerate(actors):
         if actor.display_text:
-            text_elements += text(actor_center(i), line_height*name_offset,
+            title_elements += text(actor_center(i), line_height*name_offset,
                 adjust="center", 
                 color=actor.fg_color,
                 text=make_bold(actor.display_text),
@@ -544,13 +561,14 @@ def convert_to_svg(game_description : str, filename : str, line_offset : int=1)
                 sx = actor_left(s)
                 dx = actor_right(d)
 
+            row = (cursor, cursor+msg_height)
             y = cursor+msg_height*0.5
-            draw_elements += arrow(sx, y, dx, y, line_color)
+            draw_elements.append((*row, arrow(sx, y, dx, y, line_color)))
             if e.msg:
-                text_elements += text((sx+dx)/2, y-msg_txtup,
+                text_elements.append((*row, text((sx+dx)/2, y-msg_txtup,
                     adjust="center", 
                     color=line_color,
-                    text=e.msg)#f"{{\\footnotesize {e.msg}}}")
+                    text=e.msg)))#f"{{\\footnotesize {e.msg}}}")
 
         elif isinstance(e, Action):
             action = e.action
@@ -562,11 +580,12 @@ def convert_to_svg(game_description : str, filename : str, line_offset : int=1)
 
             cursor = actor_cursors[e.actor]
             actor_cursors[e.actor] = cursor + e_line_height*line_height
+            row = (min(cursor, actor_cursors[e.actor]), max(cursor, actor_cursors[e.actor]))
 
             if is_line:
                 # TODO: better
                 y = cursor+0.5*e_line_height*line_height + line_height*0.3
-                draw_elements += line(actor_left(e.actor)+leftpad, y, actor_right(e.actor)-leftpad, y, actor.fg_color)
+                draw_elements.append((*row, line(actor_left(e.actor)+leftpad, y, actor_right(e.actor)-leftpad, y, actor.fg_color)))
             elif action:
                 y = cursor+(0.5+e_line_height*0.5)*line_height
                 bold = False
@@ -592,14 +611,14 @@ def convert_to_svg(game_description : str, filename : str, line_offset : int=1)
                     action = action_it
                     italic = True
 
-                text_elements += text(
+                text_elements.append((*row, text(
                     x=actor_center(e.actor) if center else actor_left(e.actor)+leftpad,
                     y=y,
                     adjust="center" if center else "left",
                     color=actors[e.actor].fg_color,
                     text=action,
                     bold=bold,
-                    italic=italic)
+                    italic=italic)))
             actor_prev_was_msg[e.actor] = True
 
     svgw = actor_right(len(actors)-1)
@@ -627,7 +646,26 @@ def convert_to_svg(game_description : str, filename : str, line_offset : int=1)
     css_dark_styles = f"""@media (prefers-color-scheme:dark) {{\n{css_dark_styles}}}\n"""
     style = f"""<style>\n{css_light_styles}{css_dark_styles}</style>\n"""
 
-    svg = style + rect_elements + draw_elements + text_elements
+    return ProtocolLayout(
+        width=svgw,
+        height=svgh,
+        header_height=action_offset*line_height,
+        style=style,
+        rect_elements=rect_elements,
+        title_elements=title_elements,
+        draw_elements=draw_elements,
+        text_elements=text_elements,
+    )
+
+
+def convert_to_svg(game_description : str, filename : str, line_offset : int=1) -> str:
+    layout = layout_protocol(game_description, filename, line_offset)
+    svgw, svgh = layout.width, layout.height
+
+    svg = (layout.style + layout.rect_elements
+        + "".join(e for _, _, e in layout.draw_elements)
+        + layout.title_elements
+        + "".join(e for _, _, e in layout.text_elements))
 
     svg = f"""<svg viewBox="-0.5 -0.5 {svgw+1} {svgh+1}" xmlns="http://www.w3.org/2000/svg">\n{svg}</svg>\n"""
     
@@ -635,6 +673,146 @@ def convert_to_svg(game_description : str, filename : str, line_offset : int=1)
 
 
 
+# Only the chunks near the viewport are inserted into the document,
+# `chunks` is sorted by the top position, which serves as the index.
+HTML_VIEWER_SCRIPT = """
+const chunks = JSON.parse(document.getElementById("chunks").textContent);
+const body = document.getElementById("body");
+const origin = Number(body.dataset.origin);
+const loaded = new Map(); // chunk index -> div
+
+// index of the last chunk starting at or above y
+function chunkAt(y) {
+    let lo = 0, hi = chunks.length - 1;
+    while (lo < hi) {
+        const mid = (lo + hi + 1) >> 1;
+        if (chunks[mid][0] <= y) lo = mid; else hi = mid - 1;
+    }
+    return lo;
+}
+
+function update() {
+    const y = origin - body.getBoundingClientRect().top;
+    const first = chunkAt(y - innerHeight);
+    const last = chunkAt(y + 2*innerHeight);
+
+    for (const [i, div] of loaded) {
+        if (i < first || i > last) {
+            div.remove();
+            loaded.delete(i);
+        }
+    }
+
+    for (let i = first; i <= last; i++) {
+        if (loaded.has(i)) continue;
+        const [top, height, svg] = chunks[i];
+        const div = document.createElement("div");
+        div.style.top = `${top - origin}px`;
+        div.innerHTML = svg;
+        body.appendChild(div);
+        loaded.set(i, div);
+    }
+}
+
+addEventListener("scroll", update, {passive: true});
+addEventListener("resize", update);
+update();
+"""
+
+HTML_VIEWER_STYLE = """
+:root {color-scheme:light dark;}
+body {margin:0;}
+svg {display:block;}
+#header {position:sticky;top:0;z-index:1;}
+#body {position:relative;}
+#body > div {position:absolute;left:0;}
+"""
+
+
+@dataclass
+class Chunk:
+    top: float
+    height: float
+    draw_elements: "list[RowElement]"
+    text_elements: "list[RowElement]"
+
+
+# split the rows of the protocol into chunks of about chunk_height,
+# the chunks cover the whole height of the svg, starting at the top
+def layout_chunks(layout : ProtocolLayout, chunk_height : float=2000) -> "list[Chunk]":
+    top, bottom = -0.5, layout.height+0.5
+
+    # text may reach out of the row it belongs to
+    overflow = 20
+
+    # cut chunks only on row boundaries
+    rows = layout.draw_elements + layout.text_elements
+    boundaries = sorted({y for y0, y1, _ in rows for y in (y0, y1)})
+    chunk_tops = [top]
+    for y in boundaries:
+        if y - chunk_tops[-1] >= chunk_height and y < bottom:
+            chunk_tops.append(y)
+    chunk_bottoms = chunk_tops[1:] + [bottom]
+
+    chunks = [Chunk(y0, y1-y0, [], []) for y0, y1 in zip(chunk_tops, chunk_bottoms)]
+
+    # rows crossing a chunk boundary are drawn in both chunks
+    for elements, chunk_elements in ((layout.draw_elements, lambda c: c.draw_elements),
+                                     (layout.text_elements, lambda c: c.text_elements)):
+        for row in elements:
+            y0, y1, _ = row
+            first = max(bisect_right(chunk_tops, y0-overflow)-1, 0)
+            last = max(bisect_right(chunk_tops, y1+overflow)-1, 0)
+            for chunk in chunks[first:last+1]:
+                chunk_elements(chunk).append(row)
+
+    return chunks
+
+
+# The svg code of all chunks is embedded into the page, so opening it still
+# reads the whole file, but only the visible chunks are turned into elements.
+def convert_to_html(game_description : str, filename : str, line_offset : int=1, chunk_height : float=2000) -> str:
+    layout = layout_protocol(game_description, filename, line_offset)
+    svgw = layout.width
+    chunks = layout_chunks(layout, chunk_height)
+
+    def svg_view(y0, h, content):
+        return (f"""<svg width="{svgw+1}" height="{h}" viewBox="-0.5 {y0} {svgw+1} {h}" xmlns="http://www.w3.org/2000/svg">\n"""
+                f"""{content}</svg>\n""")
+
+    # the header is drawn over the top of the first chunk,
+    # rows reaching into it remain visible between the actors
+    header_height = layout.header_height+0.5
+    header = svg_view(-0.5, header_height, layout.style + layout.rect_elements + layout.title_elements)
+
+    chunks_data = [
+        (c.top, c.height, svg_view(c.top, c.height,
+            layout.rect_elements
+            + "".join(e for _, _, e in c.draw_elements)
+            + "".join(e for _, _, e in c.text_elements)))
+        for c in chunks
+    ]
+    # `</` would end the script element
+    chunks_json = json.dumps(chunks_data).replace("</", "<\\/")
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{escape_xml(os.path.basename(filename))}</title>
+<style>{HTML_VIEWER_STYLE}</style>
+</head>
+<body>
+<div id="header" style="width:{svgw+1}px">
+{header}</div>
+<div id="body" data-origin="{chunks[0].top}" style="width:{svgw+1}px;height:{layout.height+1}px;margin-top:-{header_height}px"></div>
+<script id="chunks" type="application/json">{chunks_json}</script>
+<script>{HTML_VIEWER_SCRIPT}</script>
+</body>
+</html>
+"""
+
+
 def create_game_pdf_tex_i(out_filename_prefix: str, description: str, fn_in: str, line_offset: int=1):
     fn_svg = f"{out_filename_prefix}.svg"
     fn_pdf = f"{out_filename_prefix}.pdf"
@@ -665,15 +843,16 @@ if __name__=="__main__":
     # eg.: python3 game.py game2.txt -o game2.svg
     from sys import argv
     if len(argv) != 4 or argv[2] != "-o":
-        print(f"Usage {argv[0]} <input> -o [<output.svg>|<output.pdf>]")
+        print(f"Usage {argv[0]} <input> -o [<output.svg>|<output.pdf>|<output.html>]")
         exit(1)
 
     fn_in = argv[1]
     fn_out = argv[3]
     is_svg = fn_out.endswith(".svg")
     is_pdf = fn_out.endswith(".pdf")
-    if not is_svg and not is_pdf:
-        print("Output file either needs to be an SVG or PDF file")
+    is_html = fn_out.endswith(".html")
+    if not is_svg and not is_pdf and not is_html:
+        print("Output file either needs to be an SVG, PDF or HTML file")
         exit(1)
     
     fn_prefix = fn_out[:-4]
@@ -683,6 +862,10 @@ if __name__=="__main__":
     if is_pdf:
         create_game_pdf_tex(fn_prefix, description, fn_in)
 
+    elif is_html:
+        content = convert_to_html(description, fn_in) # throws
+        complete_files_tasks([(fn_out, content)],[])
+
     else:
         content = convert_to_svg(description, fn_in) # throws
         complete_files_tasks([(fn_out, content)],[])        